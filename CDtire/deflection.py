@@ -13,7 +13,87 @@
 # -------------------------------------------------------
 
 from odbAccess import openOdb
-import os, sys, re
+import os, sys, re, ast, pickle
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Abaqus Python normally ships without numba
+    njit = None
+
+# ODB base name -> pressure, load, camber, extra suffix
+ODB_NAME_RE = re.compile(r'2_rev_(p\d+)_?(l\d+)_?([-\d]+)?(.*)')
+
+# Arithmetic-only expressions allowed in parameters.inc
+_EXPR_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Load,
+               ast.Constant, ast.operator, ast.unaryop)
+_expr_cache = {}
+
+
+def eval_expr(src, names):
+    """Evaluate an arithmetic expression, resolving identifiers from `names`."""
+    code = _expr_cache.get(src)
+    if code is None:
+        tree = ast.parse(src.strip(), mode="eval")
+        for node in ast.walk(tree):
+            if not isinstance(node, _EXPR_NODES) or (
+                    isinstance(node, ast.Constant) and not isinstance(node.value, (int, float))):
+                raise ValueError(f"Unsupported expression: {src!r}")
+        code = _expr_cache[src] = compile(tree, "<parameters.inc>", "eval")
+    return eval(code, {"__builtins__": {}}, names)
+
+
+def masked_argmax_u3(labels, data, surf_sorted):
+    """Index and value of max |U3| over labels present in sorted surf_sorted (-1 if none)."""
+    best_i = -1
+    best = -1.0
+    n_surf = surf_sorted.size
+    for i in range(labels.size):
+        lab = labels[i]
+        lo = 0
+        hi = n_surf
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if surf_sorted[mid] < lab:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < n_surf and surf_sorted[lo] == lab:
+            v = abs(data[i, 2])
+            if v > best:
+                best = v
+                best_i = i
+    return best_i, best
+
+
+if njit is not None:
+    masked_argmax_u3 = njit(cache=True)(masked_argmax_u3)
+
+
+def odb_cache_key(path):
+    """(mtime_ns, size) of the ODB, used to validate sidecar caches."""
+    st = os.stat(path)
+    return np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+
+def load_cached_arrays(cache_file, key):
+    """Arrays stored by save_cached_arrays, or None if missing/stale/unreadable."""
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with np.load(cache_file) as data:
+            if np.array_equal(data["key"], key):
+                return {k: data[k] for k in data.files if k != "key"}
+    except Exception:
+        pass
+    return None
+
+
+def save_cached_arrays(cache_file, key, **arrays):
+    try:
+        np.savez(cache_file, key=key, **arrays)
+    except OSError as exc:
+        print(f"[WARN] Could not write cache {cache_file}: {exc}")
 
 # --------------------------
 # 1) Input arguments
@@ -43,19 +123,39 @@ else:
     print(f"✅ Found parameters.inc: {param_file}")
 
 # --------------------------
-# 2) Read parameters.inc
+# 2) Read parameters.inc (parsed dict cached in parameters.inc.cache)
 # --------------------------
-params = {}
-with open(param_file) as f:
-    for line in f:
-        line = line.strip()
-        if not line or line.startswith(("*", "**", "C")) or "=" not in line:
-            continue
-        key, val = [x.strip() for x in line.split("=", 1)]
-        try:
-            params[key.lower()] = float(eval(val, {}, params))
-        except Exception:
-            params[key.lower()] = val
+param_cache = param_file + ".cache"
+param_stat = os.stat(param_file)
+param_key = (param_stat.st_mtime_ns, param_stat.st_size)
+
+params = None
+if os.path.isfile(param_cache):
+    try:
+        with open(param_cache, "rb") as f:
+            cached_key, cached_params = pickle.load(f)
+        if cached_key == param_key:
+            params = cached_params
+    except Exception:
+        params = None
+
+if params is None:
+    params = {}
+    with open(param_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(("*", "**", "C")) or "=" not in line:
+                continue
+            key, val = [x.strip() for x in line.split("=", 1)]
+            try:
+                params[key.lower()] = float(eval_expr(val, params))
+            except Exception:
+                params[key.lower()] = val
+    try:
+        with open(param_cache, "wb") as f:
+            pickle.dump((param_key, params), f)
+    except OSError as exc:
+        print(f"[WARN] Could not write cache {param_cache}: {exc}")
 
 if speed_var not in params:
     print(f"❌ Speed variable {speed_var} not found in parameters.inc")
@@ -64,10 +164,7 @@ if speed_var not in params:
 kmph_to_mmps = params.get("kmph_to_mmps", 1000 * 1000.0 / 3600)
 speed_expr = params[speed_var]
 if isinstance(speed_expr, str):
-    speed_eval = speed_expr.lower()
-    for k, v in params.items():
-        speed_eval = speed_eval.replace(k, str(v))
-    speed_mmps = abs(eval(speed_eval))
+    speed_mmps = abs(eval_expr(speed_expr.lower(), params))
 else:
     speed_mmps = abs(speed_expr)
 speed_kmph = int(round(speed_mmps / kmph_to_mmps))
@@ -77,7 +174,7 @@ print(f"✅ Speed {speed_var} = {speed_mmps:.6f} mm/s ({speed_kmph} kmph)")
 # 3) Parse ODB combination
 # --------------------------
 base_name = os.path.splitext(os.path.basename(odb_name))[0]  # remove .odb
-m = re.search(r'2_rev_(p\d+)_?(l\d+)_?([-\d]+)?(.*)', base_name.lower())
+m = ODB_NAME_RE.search(base_name.lower())
 if not m:
     print("❌ Could not parse pressure/load/camber from ODB name")
     sys.exit(1)
@@ -90,83 +187,126 @@ print(f"✅ Combination detected → Pressure: {pressure}, Load: {load}, Camber:
 # 4) Open ODB and last step/frame
 # --------------------------
 print("🔍 Opening ODB and extracting deflection data...")
-odb = openOdb(path=odb_path)
-if len(odb.steps) == 0:
-    print("❌ No steps in ODB")
-    odb.close()
-    sys.exit(1)
+odb = openOdb(path=odb_path, readOnly=True)
+try:
+    if len(odb.steps) == 0:
+        print("❌ No steps in ODB")
+        sys.exit(1)
 
-last_step_name = list(odb.steps.keys())[-1]
-step = odb.steps[last_step_name]
-last_frame = step.frames[-1]
-disp_field = last_frame.fieldOutputs["U"]
-print(f"✅ Using last step: {last_step_name}")
+    last_step_name = next(reversed(odb.steps.keys()))
+    step = odb.steps[last_step_name]
+    last_frame = step.frames[-1]
+    disp_field = last_frame.fieldOutputs["U"]
+    print(f"✅ Using last step: {last_step_name}")
 
-# --------------------------
-# 5) Collect nodes from TREAD_TOP_SURFACE
-# --------------------------
-surface_nodes = set()
-try:
-    surf = odb.rootAssembly.surfaces["TREAD_TOP_SURFACE"]
-    print("✅ Using surface: TREAD_TOP_SURFACE")
-    for e in surf.elements:
-        if str(type(e)).endswith("SymbolicConstant'>"):
-            continue
-        if str(type(e)).endswith("OdbMeshElementArray'>"):
-            for ee in e:
-                for n in ee.connectivity:
-                    surface_nodes.add(n)
-        else:
-            for n in e.connectivity:
-                surface_nodes.add(n)
-except KeyError:
-    print("⚠️ Surface 'TREAD_TOP_SURFACE' not found → using all solid elements")
-    for inst in odb.rootAssembly.instances.values():
-        if any(k in inst.name.upper() for k in ("RIGID", "REF", "ANALYTICAL", "SURF")):
-            continue
-        for elem in inst.elements:
-            if elem.type.upper().startswith(("C3D", "CPE", "CGAX")):
-                for n in elem.connectivity:
-                    surface_nodes.add(n)
-
-if not surface_nodes:
-    print("❌ No nodes found.")
-    odb.close()
-    sys.exit(1)
+    # --------------------------
+    # 5) Collect nodes from TREAD_TOP_SURFACE (cached next to the ODB)
+    # --------------------------
+    surface_cache = os.path.splitext(odb_path)[0] + "_surface_nodes.npz"
+    cache_key = odb_cache_key(odb_path)
+    cached = load_cached_arrays(surface_cache, cache_key)
+    if cached is not None:
+        surface_nodes = cached["surface_nodes"]
+        print(f"Using cached TREAD_TOP_SURFACE nodes: {os.path.basename(surface_cache)}")
+    else:
+        from_surface = False
+        conns = []
+        try:
+            surf = odb.rootAssembly.surfaces["TREAD_TOP_SURFACE"]
+            print("✅ Using surface: TREAD_TOP_SURFACE")
+            from_surface = True
+            # Classify each distinct item type once instead of per element
+            symbolic_types, array_types, elem_types = set(), set(), set()
+            for e in surf.elements:
+                t = type(e)
+                if t in elem_types:
+                    conns.append(np.asarray(e.connectivity, dtype=np.int32))
+                elif t in array_types:
+                    conns.extend(np.asarray(ee.connectivity, dtype=np.int32) for ee in e)
+                elif t in symbolic_types:
+                    continue
+                else:
+                    tname = str(t)
+                    if tname.endswith("SymbolicConstant'>"):
+                        symbolic_types.add(t)
+                    elif tname.endswith("OdbMeshElementArray'>"):
+                        array_types.add(t)
+                        conns.extend(np.asarray(ee.connectivity, dtype=np.int32) for ee in e)
+                    else:
+                        elem_types.add(t)
+                        conns.append(np.asarray(e.connectivity, dtype=np.int32))
+        except KeyError:
+            print("⚠️ Surface 'TREAD_TOP_SURFACE' not found → using all solid elements")
+            for inst in odb.rootAssembly.instances.values():
+                if any(k in inst.name.upper() for k in ("RIGID", "REF", "ANALYTICAL", "SURF")):
+                    continue
+                conns.extend(np.asarray(elem.connectivity, dtype=np.int32) for elem in inst.elements
+                             if elem.type.upper().startswith(("C3D", "CPE", "CGAX")))
 
-# --------------------------
-# 6) Find node with max U3
-# --------------------------
-max_u3 = -1e9
-max_node = None
-for val in disp_field.values:
-    if val.nodeLabel in surface_nodes:
-        u3 = abs(val.data[2])
-        if u3 > max_u3:
-            max_u3 = u3
-            max_node = val.nodeLabel
-
-if max_node is None:
-    print("❌ No valid node found.")
-    odb.close()
-    sys.exit(1)
+        # Sorted unique node labels (used for searchsorted membership below)
+        surface_nodes = np.unique(np.concatenate(conns)) if conns else np.empty(0, dtype=np.int32)
+        if from_surface:
+            save_cached_arrays(surface_cache, cache_key, surface_nodes=surface_nodes)
 
-# Node object
-node_obj = None
-for inst in odb.rootAssembly.instances.values():
+    if not surface_nodes.size:
+        print("❌ No nodes found.")
+        sys.exit(1)
+
+    # --------------------------
+    # 6) Find node with max U3
+    # --------------------------
+    max_u3 = -1e9
+    max_node = None
+    max_inst = None
     try:
-        node_obj = inst.getNodeFromLabel(max_node)
-        if node_obj:
-            break
-    except:
-        continue
-
-if node_obj is None:
-    print("❌ Node object not found.")
+        blocks = disp_field.bulkDataBlocks
+    except AttributeError:
+        blocks = None
+
+    if blocks:
+        # Vectorized pass over the bulk arrays instead of per-value objects
+        labels = np.concatenate([b.nodeLabels for b in blocks])
+        data = np.concatenate([b.data for b in blocks], axis=0)
+        # Each bulk block belongs to a single instance
+        block_ids = np.repeat(np.arange(len(blocks)), [len(b.nodeLabels) for b in blocks])
+        if njit is not None:
+            # Fused search/abs/argmax kernel, no temporaries
+            idx, _ = masked_argmax_u3(labels, data, surface_nodes)
+        else:
+            pos = np.searchsorted(surface_nodes, labels)
+            mask = surface_nodes[np.minimum(pos, surface_nodes.size - 1)] == labels
+            idx = int(np.where(mask, np.abs(data[:, 2]), -1).argmax()) if mask.any() else -1
+        if idx >= 0:
+            max_node = int(labels[idx])
+            max_u3 = float(abs(data[idx, 2]))
+            max_inst = blocks[int(block_ids[idx])].instance
+    else:
+        surface_set = set(surface_nodes.tolist())
+        for val in disp_field.values:
+            if val.nodeLabel in surface_set:
+                u3 = abs(val.data[2])
+                if u3 > max_u3:
+                    max_u3 = u3
+                    max_node = val.nodeLabel
+                    max_inst = val.instance
+
+    if max_node is None:
+        print("❌ No valid node found.")
+        sys.exit(1)
+
+    # Node object (looked up directly on the instance that owns max_node)
+    node_obj = None
+    if max_inst is not None:
+        node_obj = odb.rootAssembly.instances[max_inst.name].getNodeFromLabel(max_node)
+
+    if node_obj is None:
+        print("❌ Node object not found.")
+        sys.exit(1)
+
+    z_coord = abs(node_obj.coordinates[2] + max_u3)  # positive deformed Z
+finally:
     odb.close()
-    sys.exit(1)
 
-z_coord = abs(node_obj.coordinates[2] + max_u3)  # positive deformed Z
 deformed_radius = z_coord
 print(f"✅ Max U3 at Node {max_node}: {max_u3:.4f} mm")
 print(f"🧩 Deformed radius: {deformed_radius:.4f} mm")
@@ -187,27 +327,24 @@ if extra:
 # --- Include file ---
 inc_file = os.path.join(odb_folder, f"{out_base}.inc")
 with open(inc_file, "w") as f:
-    f.write(f"C Auto-generated by deflection.py\n")
-    f.write(f"      kttstep = 6\n")
-    f.write(f"      omegafr      = {omega:.6f}\n")
+    f.write("C Auto-generated by deflection.py\n"
+            "      kttstep = 6\n"
+            f"      omegafr      = {omega:.6f}\n")
 print(f"✅ Created {inc_file}")
 
 # --- Road position include file (no speed in name) ---
 road_file = os.path.join(odb_folder, f"12_road_pos_{pressure}_{load}.inc")
 with open(road_file, "w") as rf:
-    rf.write("*parameter\n")
-    rf.write(f"road_pos={z_coord:.6f}\n")
+    rf.write(f"*parameter\nroad_pos={z_coord:.6f}\n")
 print(f"✅ Created road position file: {road_file}")
 
 # --- Fortran template ---
 template_f = os.path.join(parent_folder, "freeroll.f")
 if os.path.isfile(template_f):
     f_file = os.path.join(odb_folder, f"{out_base}.f")
-    with open(template_f) as tf:
-        lines = tf.readlines()
-    new_lines = [line.replace("0_freeroll_initial.inc", os.path.basename(inc_file)) for line in lines]
-    with open(f_file, "w") as nf:
-        nf.writelines(new_lines)
+    inc_name = os.path.basename(inc_file)
+    with open(template_f, buffering=1 << 20) as tf, open(f_file, "w") as nf:
+        nf.writelines(line.replace("0_freeroll_initial.inc", inc_name) for line in tf)
     print(f"✅ Created Fortran: {f_file}")
 else:
     print(f"⚠️ Fortran template not found: {template_f}")
@@ -216,15 +353,11 @@ else:
 template_inp = os.path.join(parent_folder, "freeroll.inp")
 if os.path.isfile(template_inp):
     inp_file = os.path.join(odb_folder, f"{out_base}.inp")
-    with open(template_inp) as tf:
-        lines = tf.readlines()
-    new_lines = [line.replace("<ini_vel>", f"{omega:.6f}")
-                     .replace("<speed>", f"{speed_mmps:.6f}") for line in lines]
-    with open(inp_file, "w") as nf:
-        nf.writelines(new_lines)
+    with open(template_inp, buffering=1 << 20) as tf, open(inp_file, "w") as nf:
+        nf.writelines(line.replace("<ini_vel>", f"{omega:.6f}")
+                          .replace("<speed>", f"{speed_mmps:.6f}") for line in tf)
     print(f"✅ Created INP: {inp_file}")
 else:
     print(f"⚠️ INP template not found: {template_inp}")
 
-odb.close()
 print("\n🎯 All files generated successfully.")
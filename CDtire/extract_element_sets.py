@@ -20,60 +20,64 @@ Extras:
 import os
 import re
 
+# Whole-word S1..S4 and the face each one maps to (applied in one pass, so no cascading)
+SURFACE_FACE_RE = re.compile(r'\bS([1-4])\b', re.ASCII)
+SURFACE_FACE_SHIFT = {'1': '3', '2': '4', '3': '5', '4': '6'}
+
+ELSET_NAME_RE = re.compile(r'elset\s*=\s*([^,]+)', re.I)
+
+SEPARATOR = "**----------------------------------------------------------------------\n"
+
+def remap_faces(text):
+    # Replace only whole word S1, S2, S3, S4
+    return SURFACE_FACE_RE.sub(lambda m: 'S' + SURFACE_FACE_SHIFT[m.group(1)], text)
+
 def parse_inp(lines):
+    """Parse an iterable of .inp lines in a single streaming pass."""
     elsets = []
     surf_names = []
     surfaces = []
     embeds = []
 
-    i = 0
-    n = len(lines)
-    while i < n:
-        line = lines[i].strip()
+    block = None          # SURFACE/EMBEDDED block currently being collected
+    in_surface = False
+
+    for raw in lines:
+        line = raw.strip()
+
+        # Continuation lines of the current block (the common case in a mesh file)
+        if block is not None:
+            if not line.startswith('*'):
+                block.append(raw)
+                if in_surface:
+                    name = line.split(',', 1)[0].strip()
+                    if name:
+                        surf_names.append(name)
+                continue
+            block = None
+
         low = line.lower()
 
         # --- ELSET ---
         if low.startswith('*elset'):
-            m = re.search(r'elset\s*=\s*([^,]+)', line, re.I)
+            m = ELSET_NAME_RE.search(line)
             if m:
                 elsets.append(m.group(1).strip())
 
         # --- SURFACE (only *SURFACE,) ---
         elif low.startswith('*surface,'):
-            block = [lines[i]]
-            j = i + 1
-            while j < n and not lines[j].lstrip().startswith('*'):
-                block.append(lines[j])
-                parts = lines[j].split(',')
-                if parts and parts[0].strip():
-                    surf_names.append(parts[0].strip())
-                j += 1
+            block = [raw]
+            in_surface = True
             surfaces.append(block)
-            i = j - 1
 
         # --- EMBEDDED ---
         elif 'embed' in low:
-            block = [lines[i]]
-            j = i + 1
-            while j < n and not lines[j].lstrip().startswith('*'):
-                block.append(lines[j])
-                j += 1
+            block = [raw]
+            in_surface = False
             embeds.append(block)
-            i = j - 1
-
-        i += 1
 
     # Deduplicate while preserving order
-    def unique(seq):
-        seen = set()
-        result = []
-        for x in seq:
-            if x not in seen:
-                seen.add(x)
-                result.append(x)
-        return result
-
-    return unique(elsets), unique(surf_names), surfaces, embeds
+    return list(dict.fromkeys(elsets)), list(dict.fromkeys(surf_names)), surfaces, embeds
 
 def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -84,52 +88,34 @@ def main():
         print(f"Error: 0_axi_mesh_xpl.inp not found in {script_dir}")
         return
 
-    with open(input_file, 'r', encoding='utf-8', errors='replace') as f:
-        lines = f.readlines()
+    # Stream the mesh file; only the SURFACE/EMBEDDED blocks are kept in memory
+    with open(input_file, 'r', encoding='utf-8', errors='replace', buffering=1 << 17) as f:
+        elsets, surf_names, surfaces, embeds = parse_inp(f)
 
-    elsets, surf_names, surfaces, embeds = parse_inp(lines)
+    # Compose output, applying the surface face remap as each line is added
+    out_lines = []
 
-    # Write output
-    with open(output_file, 'w', encoding='utf-8') as out:
-        # Section 1: ELSET names
-        for name in elsets:
-            out.write(name + "\n")
-        out.write("**----------------------------------------------------------------------\n")
-
-        # Section 2: Import surface names
-        for name in surf_names:
-            out.write(name + "\n")
-        out.write("**----------------------------------------------------------------------\n")
-
-        # Section 3: SURFACE and EMBEDDED blocks
-        for block in surfaces:
-            out.writelines(block)
-            out.write("**----------------------------------------------------------------------\n")
-        for block in embeds:
-            out.writelines(block)
-            out.write("**----------------------------------------------------------------------\n")
-
-    # --- Post-process replacements ---
-    with open(output_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-
-    # Mapping for surface replacements without cascading issues
-    mapping = {
-        'S1': 'S3',
-        'S2': 'S4',
-        'S3': 'S5',
-        'S4': 'S6',
-    }
-
-    def replace_surface(match):
-        val = match.group(0)
-        return mapping.get(val, val)
+    def emit(line):
+        out_lines.append(remap_faces(line))
 
-    # Replace only whole word S1, S2, S3, S4
-    text = re.sub(r'\bS[1-4]\b', replace_surface, text)
+    # Section 1: ELSET names
+    for name in elsets:
+        emit(name + "\n")
+    out_lines.append(SEPARATOR)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(text)
+    # Section 2: Import surface names
+    for name in surf_names:
+        emit(name + "\n")
+    out_lines.append(SEPARATOR)
+
+    # Section 3: SURFACE and EMBEDDED blocks
+    for block in surfaces + embeds:
+        for line in block:
+            emit(line)
+        out_lines.append(SEPARATOR)
+
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.writelines(out_lines)
 
     print(f"Done. Wrote processed output to {output_file}")
 
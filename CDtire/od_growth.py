@@ -11,6 +11,35 @@
 from odbAccess import openOdb
 import sys
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+def odb_cache_key(path):
+    """(mtime_ns, size) of the ODB, used to validate sidecar caches."""
+    st = os.stat(path)
+    return np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+
+
+def load_cached_arrays(cache_file, key):
+    """Arrays stored by save_cached_arrays, or None if missing/stale/unreadable."""
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with np.load(cache_file) as data:
+            if np.array_equal(data["key"], key):
+                return {k: data[k] for k in data.files if k != "key"}
+    except Exception:
+        pass
+    return None
+
+
+def save_cached_arrays(cache_file, key, **arrays):
+    try:
+        np.savez(cache_file, key=key, **arrays)
+    except OSError as exc:
+        print(f"[WARN] Could not write cache {cache_file}: {exc}")
+
 
 # -------------------------------------------------------
 # 1) Get ODB filename and open
@@ -27,44 +56,99 @@ if not os.path.isfile(odb_path):
 odb = openOdb(path=odb_path, readOnly=True)
 
 # -------------------------------------------------------
-# 2) Collect nodes of continuum elements
+# 2) Collect nodes of continuum elements (cached next to the ODB)
 # -------------------------------------------------------
-solid_nodes = set()
-for inst in odb.rootAssembly.instances.values():
-    name_up = inst.name.upper()
-    if any(k in name_up for k in ("RIGID", "REF", "ANALYTICAL", "SURF")):
-        continue
-    for elem in inst.elements:
-        etype = elem.type.upper()
-        if etype.startswith("C3D") or etype.startswith("CPE") or etype.startswith("CGAX"):
-            for nd in elem.connectivity:
-                solid_nodes.add((inst.name, nd))
+SOLID_TYPES = ("C3D", "CPE", "CGAX")
+
+# Struct-of-arrays: solid_labels[inst_start[i]:inst_end[i]] are the sorted
+# solid node labels of the instance with id i in inst_id_map
+inst_id_map = {name: i for i, name in enumerate(odb.rootAssembly.instances.keys())}
+solid_insts = {name for name in inst_id_map
+               if not any(k in name.upper() for k in ("RIGID", "REF", "ANALYTICAL", "SURF"))}
+
+solid_cache = os.path.splitext(odb_path)[0] + "_solid_nodes.npz"
+cache_key = odb_cache_key(odb_path)
+cached = load_cached_arrays(solid_cache, cache_key)
+if cached is not None:
+    solid_labels, solid_inst_ids = cached["solid_labels"], cached["solid_inst_ids"]
+    print(f"[OK] Using cached solid nodes: {os.path.basename(solid_cache)}")
+else:
+    label_parts = [np.empty(0, dtype=np.int32)]
+    id_parts = [np.empty(0, dtype=np.int32)]
+    for inst_name, inst in odb.rootAssembly.instances.items():
+        if inst_name not in solid_insts:
+            continue
+        conns = [np.asarray(elem.connectivity, dtype=np.int32) for elem in inst.elements
+                 if elem.type.upper().startswith(SOLID_TYPES)]
+        if conns:
+            inst_labels = np.unique(np.concatenate(conns))
+            label_parts.append(inst_labels)
+            id_parts.append(np.full(inst_labels.size, inst_id_map[inst_name], dtype=np.int32))
+
+    solid_labels = np.concatenate(label_parts)
+    solid_inst_ids = np.concatenate(id_parts)
+    order = np.lexsort((solid_labels, solid_inst_ids))
+    solid_labels, solid_inst_ids = solid_labels[order], solid_inst_ids[order]
+    save_cached_arrays(solid_cache, cache_key, solid_labels=solid_labels, solid_inst_ids=solid_inst_ids)
+
+inst_start = np.searchsorted(solid_inst_ids, np.arange(len(inst_id_map)), side="left")
+inst_end = np.searchsorted(solid_inst_ids, np.arange(len(inst_id_map)), side="right")
 
 # -------------------------------------------------------
-# 3) Undeformed values
+# 3) Undeformed values (same instances as the inflated scan below)
 # -------------------------------------------------------
+# The ODB API is not documented as thread-safe, so the per-instance node scans
+# run serially unless OD_GROWTH_WORKERS > 1 is set explicitly
+SCAN_WORKERS = max(1, int(os.environ.get("OD_GROWTH_WORKERS", "1")))
+
+
+def scan_instance(inst_name, inst):
+    """(max_x, max_y, min_x_solid, max_x_solid) over one instance's undeformed nodes."""
+    nodes = inst.nodes
+    if not len(nodes):
+        return None
+    # One traversal of the node repository: (label, x, y) per node
+    flat = np.fromiter((v for n in nodes for v in (n.label, *n.coordinates[:2])),
+                       dtype=np.float64, count=3 * len(nodes)).reshape(-1, 3)
+    labels = flat[:, 0].astype(np.int32)
+    coords = flat[:, 1:]
+    x_lo, x_hi = 1.0e99, -1.0e99
+
+    iid = inst_id_map[inst_name]
+    inst_solid = solid_labels[inst_start[iid]:inst_end[iid]]
+    if inst_solid.size:
+        pos = np.searchsorted(inst_solid, labels)
+        mask = inst_solid[np.minimum(pos, inst_solid.size - 1)] == labels
+        if mask.any():
+            xs = coords[mask, 0]
+            x_lo, x_hi = float(xs.min()), float(xs.max())
+    return float(coords[:, 0].max()), float(coords[:, 1].max()), x_lo, x_hi
+
+
+scan_names = [nm for nm in odb.rootAssembly.instances.keys() if nm in solid_insts]
+scan_insts = [odb.rootAssembly.instances[nm] for nm in scan_names]
+if SCAN_WORKERS > 1 and len(scan_insts) > 1:
+    with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(scan_insts))) as ex:
+        results = list(ex.map(scan_instance, scan_names, scan_insts))
+else:
+    results = [scan_instance(nm, inst) for nm, inst in zip(scan_names, scan_insts)]
+
 max_x_init = -1.0e99
 max_y_init = -1.0e99
 min_x_solid = 1.0e99
 max_x_solid = -1.0e99
-
-for inst_name, inst in odb.rootAssembly.instances.items():
-    for node in inst.nodes:
-        x, y = node.coordinates[0], node.coordinates[1]
-        if x > max_x_init:
-            max_x_init = x
-        if y > max_y_init:
-            max_y_init = y
-        if (inst_name, node.label) in solid_nodes:
-            if x < min_x_solid:
-                min_x_solid = x
-            if x > max_x_solid:
-                max_x_solid = x
+for res in results:
+    if res is None:
+        continue
+    max_x_init = max(max_x_init, res[0])
+    max_y_init = max(max_y_init, res[1])
+    min_x_solid = min(min_x_solid, res[2])
+    max_x_solid = max(max_x_solid, res[3])
 
 section_height = None
 five_percent = None
 fifteen_percent = None
-if solid_nodes and max_x_solid > -1e98 and min_x_solid < 1e98:
+if solid_labels.size and max_x_solid > -1e98 and min_x_solid < 1e98:
     section_height = max_x_solid - min_x_solid
     five_percent = 0.05 * section_height
     fifteen_percent = 0.15 * section_height  # new 15% value
@@ -72,24 +156,30 @@ if solid_nodes and max_x_solid > -1e98 and min_x_solid < 1e98:
 # -------------------------------------------------------
 # 4) Inflated values (last frame of last step)
 # -------------------------------------------------------
-valid_steps = [nm for nm, st in odb.steps.items() if st.frames]
-if not valid_steps:
+last_step = None
+for st in odb.steps.values():
+    if st.frames:
+        last_step = st
+if last_step is None:
     odb.close()
     raise RuntimeError("No steps with frames found in the ODB.")
 
-last_step = odb.steps[valid_steps[-1]]
 last_frame = last_step.frames[-1]
 coord_field = last_frame.fieldOutputs['COORD']
 
 max_x_inflated = -1.0e99
 max_y_inflated = -1.0e99
 
-for val in coord_field.values:
-    x, y = val.data[0], val.data[1]
-    if x > max_x_inflated:
-        max_x_inflated = x
-    if y > max_y_inflated:
-        max_y_inflated = y
+# Only read COORD for the instances kept in section 2 (skips rigid/reference nodes)
+for inst_name, inst in odb.rootAssembly.instances.items():
+    if inst_name not in solid_insts:
+        continue
+    for block in coord_field.getSubset(region=inst).bulkDataBlocks:
+        data = block.data
+        if not len(data):
+            continue
+        max_x_inflated = max(max_x_inflated, float(data[:, 0].max()))
+        max_y_inflated = max(max_y_inflated, float(data[:, 1].max()))
 
 odb.close()
 